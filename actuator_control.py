@@ -18,16 +18,32 @@ Actuator Wiring (Separate Power Supply Required):
 - Actuator wire 1: Relay 1 NO (Normally Open) terminal
 - Actuator wire 2: Relay 2 NO (Normally Open) terminal
 - Actuator Power Supply Negative: Connect to actuator common/ground
+
+Both relay lines are driven through the libgpiod character device
+(/dev/gpiochip0) with a single line request, so every state change is one
+set_values() ioctl on an already-open file descriptor.
 """
 
-import RPi.GPIO as GPIO
+import gpiod
+import argparse
+import atexit
+import ctypes
+import logging
+import logging.handlers
+import math
+import os
+import queue
 import time
 import signal
 import sys
 import threading
-from flask import Flask, jsonify, request, send_from_directory
+from dataclasses import dataclass
+import msgspec
+import orjson
+from flask import Flask, Response, jsonify, request, send_from_directory
 
 # GPIO pin configuration
+GPIO_CHIP = 'gpiochip0'  # GPIO character device for the header pins
 RELAY_CHANNEL_1 = 2   # GPIO pin for relay channel 1
 RELAY_CHANNEL_2 = 3   # GPIO pin for relay channel 2
 
@@ -38,156 +54,360 @@ CYCLE_RETRACT_TIME = 4.5     # Retract time in cycle
 STOP_DELAY = 0.1             # Stop delay between extend/retract (100ms)
 CYCLE_WAIT_TIME = 10.0       # Wait time between cycles
 
+# API server configuration
+API_HOST = '0.0.0.0'
+API_PORT = 5000
+API_THREADS = 4              # waitress worker threads
+
+# Real-time configuration for the control thread
+# CONTROL_CPU should be isolated from the scheduler on the kernel command line
+# (isolcpus=3 nohz_full=3 rcu_nocbs=3) so only the control thread runs there
+CONTROL_CPU = 3              # CPU the control thread is pinned to
+CONTROL_PRIORITY = 80        # SCHED_FIFO priority of the control thread
+MCL_CURRENT = 1              # mlockall() flags from <sys/mman.h>
+MCL_FUTURE = 2
+
 # Actuator control logic:
-# Both GPIO ON (LOW for low-level trigger) = Retract
-# Both GPIO OFF (HIGH for low-level trigger) = Extend
+# Both GPIO ON (LOW for low-level trigger) = Extend
+# Both GPIO OFF (HIGH for low-level trigger) = Retract
 # Different states = Stop
 # Since this is a LOW-level trigger relay:
 # GPIO LOW (0) = Relay ON
 # GPIO HIGH (1) = Relay OFF
-RELAY_ON = GPIO.LOW
-RELAY_OFF = GPIO.HIGH
+# Both relays are always written together in one set_values() call; writing
+# them one at a time would briefly drive an unintended state (e.g. extend
+# passing through stop) between the two writes.
+RELAY_ON = 0
+RELAY_OFF = 1
+
+# Relay levels for [RELAY_CHANNEL_1, RELAY_CHANNEL_2] in each actuator state,
+# built once so every transition is a single set_values() with no lookups
+EXTEND_VALUES = [RELAY_ON, RELAY_ON]     # Both ON = Extend
+RETRACT_VALUES = [RELAY_OFF, RELAY_OFF]  # Both OFF = Retract
+STOP_VALUES = [RELAY_ON, RELAY_OFF]      # One ON, one OFF = Stop
+
+
+@dataclass(frozen=True, slots=True)
+class ActuatorConfig:
+    """Relay pins and timing (in seconds) for an actuator setup"""
+    pin_a: int = RELAY_CHANNEL_1
+    pin_b: int = RELAY_CHANNEL_2
+    extend: float = CYCLE_EXTEND_TIME
+    retract: float = CYCLE_RETRACT_TIME
+    wait: float = CYCLE_WAIT_TIME
+    initial_retract: float = INITIAL_RETRACT_TIME
+    stop_delay: float = STOP_DELAY
+    
+    def phases(self):
+        """
+        Return the cycle state machine as (state, relay values, duration) per phase
+        
+        The wait phase has a duration of None, meaning the current
+        cycle_wait_time, which can be changed through the API.
+        """
+        return (
+            ('opening', EXTEND_VALUES, self.extend),
+            ('stopped', STOP_VALUES, self.stop_delay),
+            ('closing', RETRACT_VALUES, self.retract),
+            ('waiting', STOP_VALUES, None),
+        )
+
+
+class WaitUpdate(msgspec.Struct):
+    """Request body for /api/cycle_wait_time"""
+    time: float | msgspec.UnsetType = msgspec.UNSET
+
 
 # Global flags and state for API control
+config = ActuatorConfig()  # Active configuration, set from the command line in main()
 running = False  # Start with cycling stopped
-cycle_wait_time = 10.0  # Default cycle wait time (will be set from CYCLE_WAIT_TIME)
+# cycle_wait_time is only ever read or replaced whole, and a single global
+# load/store of a float is atomic under CPython's GIL, so it is not guarded
+# by lock
+cycle_wait_time = 10.0  # Default cycle wait time (will be set from config.wait)
 cycle_thread = None
+stop_event = threading.Event()  # Set to interrupt the control thread's waits
 lock = threading.Lock()
-gpio_initialized = False
+chip = None   # gpiod.Chip handle for GPIO_CHIP
+lines = None  # gpiod line bulk holding both relay channels, held open until exit
+relay_values = None  # Relay levels last written to lines (the only handle ever requested)
+relay_lock = threading.Lock()  # Serializes relay writes with relay_values
 current_state = 'stopped'
+# Cached /api/status response as ((running, cycle_wait_time, state), JSON body),
+# replaced as one tuple so readers never see a key with another key's body
+status_cache = (None, b'')
+
+# Logging: records are queued by the calling thread and written by a
+# QueueListener thread, so the control thread never blocks on stdout/journald
+log = logging.getLogger('actuator')
+log_queue = queue.Queue()
 
 # Flask app
 app = Flask(__name__, static_folder='static')
 
 
-def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
-    global running
-    print("\nStopping actuator control...")
-    running = False
-    stop_actuator()
-    GPIO.cleanup()
-    sys.exit(0)
-
-
 def set_state(new_state):
     """Update the current actuator state"""
     global current_state
     with lock:
         current_state = new_state
-    print("State set to {}".format(new_state))
+    log.debug("State set to %s", new_state)
 
 
 def setup_gpio():
-    """Initialize GPIO pins"""
-    global gpio_initialized
-    if gpio_initialized:
-        return
-    
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
-    GPIO.setup(RELAY_CHANNEL_1, GPIO.OUT)
-    GPIO.setup(RELAY_CHANNEL_2, GPIO.OUT)
-    
-    # Initialize to stop state (different states)
-    GPIO.output(RELAY_CHANNEL_1, RELAY_ON)
-    GPIO.output(RELAY_CHANNEL_2, RELAY_OFF)
-    gpio_initialized = True
+    """
+    Initialize GPIO pins
+    
+    Called through gpio_lines(), which keeps the returned line handle in the
+    Flask app; later calls just return the existing handle.
+    
+    Returns:
+        The gpiod line bulk for both relay channels
+    """
+    global chip, lines, relay_values
+    if lines is not None:
+        return lines
+    
+    chip = gpiod.Chip(GPIO_CHIP)
+    lines = chip.get_lines([config.pin_a, config.pin_b])
+    
+    # Request both lines as outputs, starting in the stop state (different states)
+    lines.request(consumer='actuator', type=gpiod.LINE_REQ_DIR_OUT,
+                  default_vals=STOP_VALUES)
+    relay_values = STOP_VALUES
     set_state('stopped')
-    print("GPIO initialized")
+    log.info("GPIO initialized")
+    return lines
 
 
-def stop_actuator():
-    """Stop the actuator by setting GPIO pins to different states"""
-    GPIO.output(RELAY_CHANNEL_1, RELAY_ON)   # One ON
-    GPIO.output(RELAY_CHANNEL_2, RELAY_OFF)  # One OFF
+def cleanup_gpio():
+    """Release the relay lines and close the GPIO chip"""
+    global chip, lines, relay_values
+    if lines is not None:
+        lines.release()
+    if chip is not None:
+        chip.close()
+    chip = None
+    lines = None
+    relay_values = None
+
+
+def gpio_lines():
+    """
+    Return the GPIO line handle owned by the Flask app
+    
+    The lines are requested on first use, so routes work whichever entry
+    point created the app.
+    
+    Returns:
+        The gpiod line bulk for both relay channels
+    """
+    if app.config.get('gpio_lines') is None:
+        app.config['gpio_lines'] = setup_gpio()
+    return app.config['gpio_lines']
+
+
+def configure_realtime():
+    """
+    Give the calling thread real-time scheduling for relay timing
+    
+    Pins the thread to CONTROL_CPU, switches it to SCHED_FIFO and locks the
+    process memory so sleeps never end in a page fault. Each step is best
+    effort: without isolcpus or the required privileges the thread keeps
+    running with the default scheduling.
+    """
+    try:
+        os.sched_setaffinity(0, {CONTROL_CPU})
+    except OSError as e:
+        log.warning("Could not pin control thread to CPU %s: %s", CONTROL_CPU, e)
+    
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(CONTROL_PRIORITY))
+    except OSError as e:
+        log.warning("Could not enable SCHED_FIFO for control thread: %s", e)
+    
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        log.warning("Could not lock process memory: %s", os.strerror(ctypes.get_errno()))
+
+
+def sleep_until(deadline, stop=None):
+    """
+    Sleep until an absolute deadline on the monotonic clock
+    
+    Timing every phase against absolute deadlines keeps the logging and
+    relay-write overhead of each step from accumulating as drift.
+    
+    Args:
+        deadline: time.monotonic() value to wake up at
+        stop: Optional threading.Event that ends the sleep early when set
+    
+    Returns:
+        True if the sleep was cut short by stop, False otherwise
+    """
+    remaining = deadline - time.monotonic()
+    if stop is not None:
+        return stop.wait(max(remaining, 0))
+    if remaining > 0:
+        time.sleep(remaining)
+    return False
+
+
+def set_relays(lines, values):
+    """
+    Drive both relays, skipping the write if they already have these levels
+    
+    Args:
+        lines: gpiod line bulk for the two relay channels
+        values: Relay levels, e.g. EXTEND_VALUES
+    """
+    global relay_values
+    with relay_lock:
+        if values == relay_values:
+            return
+        lines.set_values(values)
+        relay_values = values
+
+
+def stop_actuator(lines):
+    """
+    Stop the actuator by setting GPIO pins to different states
+    
+    Args:
+        lines: gpiod line bulk for the two relay channels
+    """
+    set_relays(lines, STOP_VALUES)
     set_state('stopped')
-    print("Actuator stopped")
+    log.debug("Actuator stopped")
 
 
-def extend_actuator(duration):
+def extend_actuator(lines, duration, start=None, stop=None):
     """
-    Extend the actuator by setting both GPIO pins to OFF (both relays OFF)
+    Extend the actuator by setting both GPIO pins to ON (both relays ON)
     
     Args:
+        lines: gpiod line bulk for the two relay channels
         duration: Time in seconds to extend
+        start: Monotonic time the extension is scheduled from (default: now)
+        stop: Optional threading.Event that stops the actuator early when set
+    
+    Returns:
+        The monotonic deadline at which the extension ended
     """
+    if start is None:
+        start = time.monotonic()
+    deadline = start + duration
     set_state('opening')
-    print("Extending actuator for {} seconds...".format(duration))
-    GPIO.output(RELAY_CHANNEL_1, RELAY_ON)  # Both ON = Extend
-    GPIO.output(RELAY_CHANNEL_2, RELAY_ON)
+    log.debug("Extending actuator for %s seconds...", duration)
+    set_relays(lines, EXTEND_VALUES)
     
-    time.sleep(duration)
+    sleep_until(deadline, stop)
     
-    stop_actuator()
-    print("Extension complete")
+    stop_actuator(lines)
+    log.debug("Extension complete")
+    return deadline
 
 
-def retract_actuator(duration):
+def retract_actuator(lines, duration, start=None, stop=None):
     """
-    Retract the actuator by setting both GPIO pins to ON (both relays ON)
+    Retract the actuator by setting both GPIO pins to OFF (both relays OFF)
     
     Args:
+        lines: gpiod line bulk for the two relay channels
         duration: Time in seconds to retract
+        start: Monotonic time the retraction is scheduled from (default: now)
+        stop: Optional threading.Event that stops the actuator early when set
+    
+    Returns:
+        The monotonic deadline at which the retraction ended
     """
+    if start is None:
+        start = time.monotonic()
+    deadline = start + duration
     set_state('closing')
-    print("Retracting actuator for {} seconds...".format(duration))
-    GPIO.output(RELAY_CHANNEL_1, RELAY_OFF)   # Both OFF = Retract
-    GPIO.output(RELAY_CHANNEL_2, RELAY_OFF)
+    log.debug("Retracting actuator for %s seconds...", duration)
+    set_relays(lines, RETRACT_VALUES)
     
-    time.sleep(duration)
+    sleep_until(deadline, stop)
     
-    stop_actuator()
-    print("Retraction complete")
+    stop_actuator(lines)
+    log.debug("Retraction complete")
+    return deadline
 
 
-def run_cycle():
-    """Execute one complete cycle: extend, stop, retract, wait"""
-    print("\n" + "="*50)
-    print("Starting new cycle")
-    print("="*50)
+def run_state_machine(cfg, stop, lines):
+    """
+    Run one pass of the cycle state machine: extend, stop, retract, wait
     
-    # Extend actuator
-    extend_actuator(CYCLE_EXTEND_TIME)
+    Each transition drives both relays and then blocks in a single wait on
+    stop until the phase's absolute deadline, so a stop request ends
+    whichever phase is active and leaves the actuator stopped.
     
-    # Stop for 100ms
-    time.sleep(STOP_DELAY)
+    Args:
+        cfg: ActuatorConfig with the phase timings
+        stop: threading.Event that ends the cycle early when set
+        lines: gpiod line bulk for the two relay channels
+    """
+    # Every phase is scheduled from this instant, so the cycle does not drift
+    deadline = time.monotonic()
+    
+    for state, values, duration in cfg.phases():
+        if duration is None:
+            # Wait before next cycle (use current cycle_wait_time)
+            duration = cycle_wait_time
+        set_relays(lines, values)
+        set_state(state)
+        log.debug("Actuator %s for %s seconds...", state, duration)
+        
+        deadline += duration
+        if sleep_until(deadline, stop):
+            stop_actuator(lines)
+            return
+
+
+def run_cycle(lines, stop):
+    """
+    Execute one complete cycle with the active configuration
     
-    # Retract actuator
-    retract_actuator(CYCLE_RETRACT_TIME)
+    Args:
+        lines: gpiod line bulk for the two relay channels
+        stop: threading.Event that ends the cycle early when set
+    """
+    log.debug("Starting new cycle")
     
-    # Wait before next cycle (use current cycle_wait_time)
-    with lock:
-        current_wait = cycle_wait_time
-    set_state('waiting')
-    print("Waiting {} seconds before next cycle...".format(current_wait))
-    time.sleep(current_wait)
+    run_state_machine(config, stop, lines)
 
 
-def actuator_control_loop():
-    """Main actuator control loop that runs in a separate thread"""
+def actuator_control_loop(lines, stop):
+    """
+    Main actuator control loop that runs in a separate thread
+    
+    Args:
+        lines: gpiod line bulk owned by the Flask app (see gpio_lines())
+        stop: threading.Event that ends the loop's current wait when set
+    """
     global running
     
     try:
-        # GPIO should already be initialized, but ensure it is
-        setup_gpio()
+        # Keep Flask request handling from perturbing relay timing
+        configure_realtime()
         
         # Initial retraction on startup
-        print("Initial retraction...")
-        retract_actuator(INITIAL_RETRACT_TIME)
+        log.debug("Initial retraction...")
+        retract_actuator(lines, config.initial_retract, stop=stop)
         
         # Start cycling immediately (no wait before first cycle)
         # Main loop
         cycle_count = 0
         while running:
             cycle_count += 1
-            print("\nCycle #{}".format(cycle_count))
-            run_cycle()
+            log.debug("Cycle #%s", cycle_count)
+            run_cycle(lines, stop)
             
     except Exception as e:
-        print("Error in actuator control loop: {}".format(e))
-        stop_actuator()
-        GPIO.cleanup()
+        log.exception("Error in actuator control loop: %s", e)
+        # Leave the lines requested; they are only released at shutdown
+        stop_actuator(lines)
         running = False
 
 
@@ -201,16 +421,23 @@ def index():
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    """Get current actuator status"""
-    with lock:
-        is_running = running
-        wait_time = cycle_wait_time
-        state = current_state
-    return jsonify({
-        'running': is_running,
-        'cycle_wait_time': wait_time,
-        'state': state
-    })
+    """
+    Get current actuator status
+    
+    The web interface polls this endpoint, so the JSON body is cached and
+    only re-serialized when the status has changed since the last request.
+    """
+    global status_cache
+    key = (running, cycle_wait_time, current_state)
+    cached_key, body = status_cache
+    if key != cached_key:
+        body = orjson.dumps({
+            'running': key[0],
+            'cycle_wait_time': key[1],
+            'state': key[2]
+        })
+        status_cache = (key, body)
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/api/start', methods=['POST'])
@@ -218,18 +445,38 @@ def start_cycling():
     """Start the actuator cycling"""
     global running, cycle_thread, cycle_wait_time
     
+    with lock:
+        if running:
+            return jsonify({'success': False, 'message': 'Actuator is already running'}), 400
+        previous = cycle_thread
+    
+    # A stopped control thread wakes at once but may not have seen running go
+    # False yet; let it exit before stop_event is cleared, or it would keep
+    # cycling next to the new thread. Joined outside lock, which it takes in
+    # set_state().
+    if previous is not None:
+        previous.join()
+    
+    # Requested before taking lock, which setup_gpio() takes in set_state()
+    lines = gpio_lines()
+    
     with lock:
         if running:
             return jsonify({'success': False, 'message': 'Actuator is already running'}), 400
         
         running = True
+        stop_event.clear()
         # Reset cycle_wait_time to default if needed
         if cycle_wait_time <= 0:
-            cycle_wait_time = CYCLE_WAIT_TIME
-    
-    # Start the actuator control thread
-    cycle_thread = threading.Thread(target=actuator_control_loop, daemon=True)
-    cycle_thread.start()
+            cycle_wait_time = config.wait
+        
+        # Start the actuator control thread. cycle_thread is replaced and
+        # started under lock, so a stop and restart racing this request
+        # always joins this thread rather than the previous one.
+        cycle_thread = threading.Thread(target=actuator_control_loop,
+                                        args=(lines, stop_event),
+                                        daemon=True)
+        cycle_thread.start()
     
     return jsonify({'success': True, 'message': 'Actuator cycling started'})
 
@@ -244,9 +491,10 @@ def stop_cycling():
             return jsonify({'success': False, 'message': 'Actuator is not running'}), 400
         
         running = False
+        stop_event.set()  # Wake the control thread out of any wait
     
     # Stop the actuator immediately
-    stop_actuator()
+    stop_actuator(gpio_lines())
     
     return jsonify({'success': True, 'message': 'Actuator cycling stopped'})
 
@@ -256,49 +504,72 @@ def update_cycle_wait_time():
     """Update the time between cycles"""
     global cycle_wait_time
     
-    data = request.get_json()
-    if not data or 'time' not in data:
-        return jsonify({'success': False, 'message': 'Missing "time" parameter'}), 400
-    
+    # Decode and type-check in one pass; strict=False still accepts numeric strings
     try:
-        new_time = float(data['time'])
-        if new_time < 0:
-            return jsonify({'success': False, 'message': 'Time must be non-negative'}), 400
-        
-        with lock:
-            cycle_wait_time = new_time
-        
-        return jsonify({
-            'success': True,
-            'message': 'Cycle wait time updated',
-            'cycle_wait_time': cycle_wait_time
-        })
-    except (ValueError, TypeError):
+        update = msgspec.json.decode(request.get_data(), type=WaitUpdate, strict=False)
+    except msgspec.ValidationError:
         return jsonify({'success': False, 'message': 'Invalid time value'}), 400
+    except msgspec.DecodeError:
+        return jsonify({'success': False, 'message': 'Invalid JSON body'}), 400
+    
+    if update.time is msgspec.UNSET:
+        return jsonify({'success': False, 'message': 'Missing "time" parameter'}), 400
+    # "inf" and "nan" pass strict=False, and threading's waits raise
+    # OverflowError past TIMEOUT_MAX
+    if not math.isfinite(update.time) or update.time > threading.TIMEOUT_MAX:
+        return jsonify({'success': False, 'message': 'Invalid time value'}), 400
+    if update.time < 0:
+        return jsonify({'success': False, 'message': 'Time must be non-negative'}), 400
+    
+    cycle_wait_time = update.time
+    
+    return jsonify({
+        'success': True,
+        'message': 'Cycle wait time updated',
+        'cycle_wait_time': cycle_wait_time
+    })
 
 
-@app.route('/api/open', methods=['POST'])
-def open_actuator():
-    """Open (extend) the actuator and pause cycling if running"""
+def pause_cycling():
+    """
+    Stop cycling before a manual move
+    
+    Waits for the control thread to exit, since a woken thread ends its
+    current phase with stop_actuator(); that write would otherwise land
+    after the manual move and leave the actuator stopped.
+    
+    Returns:
+        True if cycling was running
+    """
     global running
     
-    # Stop cycling if it's running
-    was_running = False
     with lock:
+        was_running = running
         if running:
             running = False
-            was_running = True
+            stop_event.set()
+        previous = cycle_thread
+    
+    # Joined outside lock, which the exiting thread takes in set_state()
+    if previous is not None:
+        previous.join()
     
     # Stop the actuator immediately if cycling was running
     if was_running:
-        stop_actuator()
+        stop_actuator(gpio_lines())
     
-    # Ensure GPIO is initialized
-    setup_gpio()
+    return was_running
+
+
+@app.route('/api/open', methods=['POST'])
+def open_actuator():
+    """Open (extend) the actuator and pause cycling if running"""
+    # Stop cycling if it's running
+    was_running = pause_cycling()
     
     # Execute the open action
     try:
-        extend_actuator(CYCLE_EXTEND_TIME)
+        extend_actuator(gpio_lines(), config.extend)
         message = 'Actuator opened'
         if was_running:
             message += ' (cycling paused)'
@@ -310,25 +581,12 @@ def open_actuator():
 @app.route('/api/close', methods=['POST'])
 def close_actuator():
     """Close (retract) the actuator and pause cycling if running"""
-    global running
-    
     # Stop cycling if it's running
-    was_running = False
-    with lock:
-        if running:
-            running = False
-            was_running = True
-    
-    # Stop the actuator immediately if cycling was running
-    if was_running:
-        stop_actuator()
-    
-    # Ensure GPIO is initialized
-    setup_gpio()
+    was_running = pause_cycling()
     
     # Execute the close action
     try:
-        retract_actuator(CYCLE_RETRACT_TIME)
+        retract_actuator(gpio_lines(), config.retract)
         message = 'Actuator closed'
         if was_running:
             message += ' (cycling paused)'
@@ -340,23 +598,12 @@ def close_actuator():
 @app.route('/api/next', methods=['POST'])
 def next_cycle():
     """Run a single open/close cycle and pause cycling if running"""
-    global running
-    
-    was_running = False
-    with lock:
-        if running:
-            running = False
-            was_running = True
-    
-    if was_running:
-        stop_actuator()
-    
-    setup_gpio()
+    was_running = pause_cycling()
     
     try:
-        extend_actuator(CYCLE_EXTEND_TIME)
-        time.sleep(STOP_DELAY)
-        retract_actuator(CYCLE_RETRACT_TIME)
+        extended = extend_actuator(gpio_lines(), config.extend)
+        sleep_until(extended + config.stop_delay)
+        retract_actuator(gpio_lines(), config.retract, extended + config.stop_delay)
         message = 'Completed one open/close cycle'
         if was_running:
             message += ' (cycling paused)'
@@ -366,39 +613,151 @@ def next_cycle():
 
 
 def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
+    """
+    Handle Ctrl+C and systemd stop requests gracefully
+    
+    Only wakes the control thread and then raises KeyboardInterrupt so the
+    server drains pending requests and returns. GPIO cleanup runs from the
+    shutdown() atexit hook, outside signal context.
+    """
     global running
-    print("\nStopping actuator control...")
-    with lock:
-        running = False
-    stop_actuator()
-    GPIO.cleanup()
-    sys.exit(0)
+    running = False
+    stop_event.set()
+    signal.default_int_handler(sig, frame)
+
+
+def shutdown():
+    """Leave the actuator stopped and release the GPIO lines at exit"""
+    log.info("Stopping actuator control...")
+    if lines is not None:
+        stop_actuator(lines)
+    cleanup_gpio()
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description='Linear actuator control with REST API'
+    )
+    
+    parser.add_argument(
+        '--pins',
+        type=int,
+        nargs=2,
+        metavar=('CH1', 'CH2'),
+        default=[RELAY_CHANNEL_1, RELAY_CHANNEL_2],
+        help='GPIO pins (BCM numbering) for relay channels 1 and 2 (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--extend',
+        type=float,
+        default=CYCLE_EXTEND_TIME,
+        help='Extend time in cycle, in seconds (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--retract',
+        type=float,
+        default=CYCLE_RETRACT_TIME,
+        help='Retract time in cycle, in seconds (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--wait',
+        type=float,
+        default=CYCLE_WAIT_TIME,
+        help='Default wait time between cycles, in seconds (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--initial-retract',
+        type=float,
+        default=INITIAL_RETRACT_TIME,
+        help='Retraction before the first cycle, in seconds (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--stop-delay',
+        type=float,
+        default=STOP_DELAY,
+        help='Stop delay between extend and retract, in seconds (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Log every actuator state change (default: warnings and errors only)'
+    )
+    
+    return parser.parse_args(argv)
+
+
+def config_from_args(args):
+    """Build an ActuatorConfig from parsed command line arguments"""
+    return ActuatorConfig(
+        pin_a=args.pins[0],
+        pin_b=args.pins[1],
+        extend=args.extend,
+        retract=args.retract,
+        wait=args.wait,
+        initial_retract=args.initial_retract,
+        stop_delay=args.stop_delay
+    )
+
+
+def setup_logging(verbose=False):
+    """
+    Send log records through log_queue to a background writer thread
+    
+    Args:
+        verbose: If True, log at DEBUG level instead of WARNING
+    
+    Returns:
+        The started QueueListener
+    """
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(logging.DEBUG if verbose else logging.WARNING)
+    log.propagate = False
+    
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
 
 
 def main():
     """Main function to start the Flask server"""
-    # Register signal handler for graceful shutdown
+    global config, cycle_wait_time
+    args = parse_args()
+    config = config_from_args(args)
+    
+    # Flush queued log records on exit
+    atexit.register(setup_logging(args.verbose).stop)
+    
+    # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
     
     # Initialize cycle_wait_time
-    global cycle_wait_time
-    cycle_wait_time = CYCLE_WAIT_TIME
+    cycle_wait_time = config.wait
     
-    # Initialize GPIO at startup
-    setup_gpio()
+    # Initialize GPIO once at startup; the app owns the line handle from here on
+    gpio_lines()
+    atexit.register(shutdown)
     
     print("Linear Actuator Control System with REST API")
     print("="*50)
-    print("Relay Channel 1: GPIO {}".format(RELAY_CHANNEL_1))
-    print("Relay Channel 2: GPIO {}".format(RELAY_CHANNEL_2))
-    print("Initial retract: {} seconds".format(INITIAL_RETRACT_TIME))
-    print("Cycle extend: {} seconds".format(CYCLE_EXTEND_TIME))
-    print("Cycle retract: {} seconds".format(CYCLE_RETRACT_TIME))
-    print("Stop delay: {} seconds".format(STOP_DELAY))
-    print("Cycle wait: {} seconds (default)".format(CYCLE_WAIT_TIME))
+    print("Relay Channel 1: GPIO {}".format(config.pin_a))
+    print("Relay Channel 2: GPIO {}".format(config.pin_b))
+    print("Initial retract: {} seconds".format(config.initial_retract))
+    print("Cycle extend: {} seconds".format(config.extend))
+    print("Cycle retract: {} seconds".format(config.retract))
+    print("Stop delay: {} seconds".format(config.stop_delay))
+    print("Cycle wait: {} seconds (default)".format(config.wait))
     print("="*50)
-    print("Web interface: http://0.0.0.0:5000")
+    print("Web interface: http://{}:{}".format(API_HOST, API_PORT))
     print("API endpoints:")
     print("  GET  /api/status - Get actuator status")
     print("  POST /api/start - Start actuator cycling")
@@ -411,8 +770,9 @@ def main():
     print("Press Ctrl+C to stop")
     print()
     
-    # Start Flask server
-    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    # Serve the Flask app with waitress instead of the Werkzeug dev server
+    from waitress import serve
+    serve(app, host=API_HOST, port=API_PORT, threads=API_THREADS)
 
 
 if __name__ == "__main__":
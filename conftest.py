@@ -0,0 +1,10 @@
+"""
+pytest configuration for the actuator controller tests
+"""
+
+import sys
+from unittest.mock import MagicMock
+
+# Stub out gpiod once for the whole session, before any test module imports
+# actuator_control (libgpiod is only available on the Raspberry Pi)
+sys.modules.setdefault('gpiod', MagicMock())
@@ -17,53 +17,85 @@ Note: For low-level trigger relay modules (like the SunFounder relay),
       Use --low-level flag for this behavior.
 """
 
-import RPi.GPIO as GPIO
 import argparse
 import sys
 
 # Default to standard GPIO behavior (HIGH = on, LOW = off)
 # Use --low-level flag for low-level trigger devices (like relays)
 
+# Common BCM GPIO pins (some are reserved); others require --force
+VALID_PINS = frozenset(range(2, 28))
 
-def setup_gpio(pin, low_level=False):
-    """Initialize GPIO pin as output"""
+# RPi.GPIO is slow to import and probes the hardware, so it is only loaded
+# once the arguments are valid and a pin actually needs to change
+GPIO = None
+
+
+def load_gpio():
+    """Import RPi.GPIO on first use and return it"""
+    global GPIO
+    if GPIO is None:
+        import RPi.GPIO as GPIO
+    return GPIO
+
+
+def gpio_level(status, low_level=False):
+    """
+    Translate a requested status into the GPIO level to drive
+    
+    Args:
+        status: 'on' or 'off'
+        low_level: If True, invert logic (for low-level trigger devices)
+    
+    Returns:
+        GPIO.HIGH or GPIO.LOW
+    """
+    load_gpio()
+    if status.lower() not in ('on', 'off'):
+        print("Error: Status must be 'on' or 'off', got '{}'".format(status))
+        sys.exit(1)
+    # HIGH = ON for standard GPIO, LOW = ON for low-level trigger
+    return GPIO.HIGH if (status.lower() == 'on') != low_level else GPIO.LOW
+
+
+def status_message(pin, status, low_level=False):
+    """Describe the level a GPIO pin was set to"""
+    level = 'HIGH' if (status.lower() == 'on') != low_level else 'LOW'
+    suffix = ' - for low-level trigger device' if low_level else ''
+    return "GPIO {} set to {} ({}{})".format(pin, status.upper(), level, suffix)
+
+
+def setup_gpio(pin, low_level=False, status='off'):
+    """
+    Initialize GPIO pin as output
+    
+    The pin is configured with its final level in a single call, so it is
+    never driven to OFF first and then switched.
+    
+    Args:
+        pin: GPIO pin number (BCM numbering)
+        low_level: If True, invert logic (for low-level trigger devices)
+        status: Initial status, 'on' or 'off' (default: 'off')
+    """
+    load_gpio()
+    initial = gpio_level(status, low_level)
     GPIO.setmode(GPIO.BCM)
     GPIO.setwarnings(False)
-    GPIO.setup(pin, GPIO.OUT)
-    
-    # Initialize to OFF state
-    if low_level:
-        GPIO.output(pin, GPIO.HIGH)  # HIGH = OFF for low-level trigger
-    else:
-        GPIO.output(pin, GPIO.LOW)   # LOW = OFF for standard GPIO
+    GPIO.setup(pin, GPIO.OUT, initial=initial)
 
 
 def set_gpio(pin, status, low_level=False):
     """
-    Set GPIO pin to specified status
+    Set an already configured GPIO pin to specified status
     
     Args:
         pin: GPIO pin number (BCM numbering)
         status: 'on' or 'off'
         low_level: If True, invert logic (for low-level trigger devices)
     """
-    if status.lower() == 'on':
-        if low_level:
-            GPIO.output(pin, GPIO.LOW)   # LOW = ON for low-level trigger
-            print("GPIO {} set to ON (LOW - for low-level trigger device)".format(pin))
-        else:
-            GPIO.output(pin, GPIO.HIGH)  # HIGH = ON for standard GPIO
-            print("GPIO {} set to ON (HIGH)".format(pin))
-    elif status.lower() == 'off':
-        if low_level:
-            GPIO.output(pin, GPIO.HIGH)  # HIGH = OFF for low-level trigger
-            print("GPIO {} set to OFF (HIGH - for low-level trigger device)".format(pin))
-        else:
-            GPIO.output(pin, GPIO.LOW)   # LOW = OFF for standard GPIO
-            print("GPIO {} set to OFF (LOW)".format(pin))
-    else:
-        print("Error: Status must be 'on' or 'off', got '{}'".format(status))
-        sys.exit(1)
+    load_gpio()
+    GPIO.output(pin, gpio_level(status, low_level))
+    print(status_message(pin, status, low_level))
 
 
 def main():
@@ -103,18 +135,23 @@ Examples:
         help='Clean up GPIO after setting (default: leave pin in set state)'
     )
     
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Allow GPIO pins outside the common BCM range 2-27'
+    )
+    
     args = parser.parse_args()
     
-    # Validate GPIO pin number (common BCM GPIO pins are 2-27, but some are reserved)
-    if args.pin < 2 or args.pin > 27:
-        print("Warning: GPIO pin {} may not be valid. Common BCM GPIO pins are 2-27.".format(args.pin))
-        response = input("Continue anyway? (y/n): ")
-        if response.lower() != 'y':
-            sys.exit(0)
+    # Validate GPIO pin number without prompting, so the tool is safe to script
+    if args.pin not in VALID_PINS and not args.force:
+        parser.error("GPIO pin {} may not be valid. Common BCM GPIO pins are 2-27; "
+                     "use --force to continue anyway.".format(args.pin))
     
+    load_gpio()
     try:
-        setup_gpio(args.pin, args.low_level)
-        set_gpio(args.pin, args.status, args.low_level)
+        setup_gpio(args.pin, args.low_level, args.status)
+        print(status_message(args.pin, args.status, args.low_level))
         
         if args.cleanup:
             GPIO.cleanup()
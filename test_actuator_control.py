@@ -4,101 +4,232 @@ Unit tests for actuator_control.py
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock, call
-import json
+from unittest.mock import DEFAULT, Mock, patch, MagicMock, call
+import logging
+import logging.handlers
+import signal
 import sys
 import threading
 import time
 
-# Mock RPi.GPIO before importing actuator_control
-sys.modules['RPi'] = MagicMock()
-sys.modules['RPi.GPIO'] = MagicMock()
+# Mock gpiod before importing actuator_control; under pytest conftest.py
+# has already installed the stub and this is a no-op
+sys.modules.setdefault('gpiod', MagicMock())
 
 # Now import the module under test
 import actuator_control
 
 
+class _ModuleStateGuard:
+    """Snapshot module globals, stop_event and the app's GPIO lines; restore on exit"""
+    
+    NAMES = ('running', 'cycle_wait_time', 'cycle_thread', 'chip', 'lines',
+             'relay_values', 'status_cache', 'current_state', 'config')
+    MISSING = object()
+    
+    def __enter__(self):
+        self._snap = {name: getattr(actuator_control, name) for name in self.NAMES}
+        self._stop_set = actuator_control.stop_event.is_set()
+        self._gpio_lines = actuator_control.app.config.get('gpio_lines', self.MISSING)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        for name, value in self._snap.items():
+            setattr(actuator_control, name, value)
+        if self._stop_set:
+            actuator_control.stop_event.set()
+        else:
+            actuator_control.stop_event.clear()
+        if self._gpio_lines is self.MISSING:
+            actuator_control.app.config.pop('gpio_lines', None)
+        else:
+            actuator_control.app.config['gpio_lines'] = self._gpio_lines
+        return False
+
+
+class _FakeThread:
+    """Stand-in for threading.Thread that records its arguments and never runs"""
+    
+    def __init__(self, target=None, args=(), kwargs=None, daemon=None):
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.daemon = daemon
+        self.started = False
+        self.started_under_lock = False
+    
+    def start(self):
+        self.started = True
+        self.started_under_lock = actuator_control.lock.locked()
+    
+    def join(self, timeout=None):
+        pass
+    
+    def is_alive(self):
+        return False
+
+
 class TestGPIOFunctions(unittest.TestCase):
     """Test GPIO control functions"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Patch gpiod with one mock shared by the whole class"""
+        cls._gpiod_mock = MagicMock()
+        cls._gpiod_patcher = patch('actuator_control.gpiod', cls._gpiod_mock)
+        cls._gpiod_patcher.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Restore gpiod"""
+        cls._gpiod_patcher.stop()
+    
     def setUp(self):
         """Reset GPIO state before each test"""
-        actuator_control.gpio_initialized = False
-        actuator_control.GPIO.reset_mock()
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
+        actuator_control.chip = None
+        actuator_control.lines = None
+        actuator_control.relay_values = None
+        self._gpiod_mock.reset_mock(return_value=True, side_effect=True)
     
-    @patch('actuator_control.GPIO')
-    def test_setup_gpio(self, mock_gpio):
+    def tearDown(self):
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
+    
+    def test_setup_gpio(self):
         """Test GPIO initialization"""
-        actuator_control.setup_gpio()
+        mock_gpiod = self._gpiod_mock
+        result = actuator_control.setup_gpio()
         
-        # Verify GPIO was configured correctly
-        mock_gpio.setmode.assert_called_once_with(actuator_control.GPIO.BCM)
-        mock_gpio.setwarnings.assert_called_once_with(False)
-        self.assertEqual(mock_gpio.setup.call_count, 2)
-        mock_gpio.setup.assert_any_call(actuator_control.RELAY_CHANNEL_1, actuator_control.GPIO.OUT)
-        mock_gpio.setup.assert_any_call(actuator_control.RELAY_CHANNEL_2, actuator_control.GPIO.OUT)
+        # Verify both relay lines were requested from the chip as outputs
+        mock_gpiod.Chip.assert_called_once_with(actuator_control.GPIO_CHIP)
+        mock_chip = mock_gpiod.Chip.return_value
+        mock_chip.get_lines.assert_called_once_with(
+            [actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_CHANNEL_2])
         
         # Verify initial state (stop state)
-        self.assertEqual(mock_gpio.output.call_count, 2)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_ON)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_2, actuator_control.RELAY_OFF)
-        
-        # Verify it's marked as initialized
-        self.assertTrue(actuator_control.gpio_initialized)
+        mock_lines = mock_chip.get_lines.return_value
+        mock_lines.request.assert_called_once_with(
+            consumer='actuator',
+            type=mock_gpiod.LINE_REQ_DIR_OUT,
+            default_vals=[actuator_control.RELAY_ON, actuator_control.RELAY_OFF])
+        
+        # Verify the line handle is kept and returned
+        self.assertIs(actuator_control.lines, mock_lines)
+        self.assertIs(result, mock_lines)
+        self.assertEqual(actuator_control.relay_values, actuator_control.STOP_VALUES)
     
-    @patch('actuator_control.GPIO')
-    def test_setup_gpio_idempotent(self, mock_gpio):
+    def test_setup_gpio_idempotent(self):
         """Test that setup_gpio can be called multiple times safely"""
-        actuator_control.setup_gpio()
-        actuator_control.setup_gpio()
+        mock_gpiod = self._gpiod_mock
+        first = actuator_control.setup_gpio()
+        second = actuator_control.setup_gpio()
         
         # Should only initialize once
-        self.assertEqual(mock_gpio.setmode.call_count, 1)
+        self.assertEqual(mock_gpiod.Chip.call_count, 1)
+        self.assertIs(first, second)
+    
+    def test_cleanup_gpio(self):
+        """Test releasing the relay lines"""
+        mock_gpiod = self._gpiod_mock
+        actuator_control.setup_gpio()
+        mock_chip = mock_gpiod.Chip.return_value
+        mock_lines = mock_chip.get_lines.return_value
+        
+        actuator_control.cleanup_gpio()
+        
+        mock_lines.release.assert_called_once()
+        mock_chip.close.assert_called_once()
+        self.assertIsNone(actuator_control.chip)
+        self.assertIsNone(actuator_control.lines)
     
-    @patch('actuator_control.GPIO')
-    def test_stop_actuator(self, mock_gpio):
+    def test_gpio_lines_sets_up_on_first_use(self):
+        """Test that the app requests the lines itself when main() did not"""
+        with patch.dict(actuator_control.app.config, {'gpio_lines': None}):
+            first = actuator_control.gpio_lines()
+            second = actuator_control.gpio_lines()
+            
+            self._gpiod_mock.Chip.assert_called_once_with(actuator_control.GPIO_CHIP)
+            self.assertIs(first, actuator_control.lines)
+            self.assertIs(second, first)
+            self.assertIs(actuator_control.app.config['gpio_lines'], first)
+    
+    def test_stop_actuator(self):
         """Test stopping the actuator"""
-        actuator_control.stop_actuator()
+        mock_lines = MagicMock()
+        actuator_control.stop_actuator(mock_lines)
         
         # Verify GPIO pins set to different states (stop)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_ON)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_2, actuator_control.RELAY_OFF)
+        mock_lines.set_values.assert_called_once_with(
+            [actuator_control.RELAY_ON, actuator_control.RELAY_OFF])
     
+    @patch('actuator_control.time.monotonic', return_value=100.0)
     @patch('actuator_control.time.sleep')
-    @patch('actuator_control.GPIO')
     @patch('actuator_control.stop_actuator')
-    def test_extend_actuator(self, mock_stop, mock_gpio, mock_sleep):
+    def test_extend_actuator(self, mock_stop, mock_sleep, mock_monotonic):
         """Test extending the actuator"""
         duration = 2.0
-        actuator_control.extend_actuator(duration)
+        mock_lines = MagicMock()
+        deadline = actuator_control.extend_actuator(mock_lines, duration)
+        self.assertEqual(deadline, 100.0 + duration)
         
         # Verify both GPIO pins set to ON (extend)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_ON)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_2, actuator_control.RELAY_ON)
+        mock_lines.set_values.assert_called_once_with(
+            [actuator_control.RELAY_ON, actuator_control.RELAY_ON])
         
         # Verify sleep was called with the duration
         mock_sleep.assert_any_call(duration)
         
         # Verify stop was called after extension
-        mock_stop.assert_called_once()
+        mock_stop.assert_called_once_with(mock_lines)
     
+    @patch('actuator_control.time.monotonic', return_value=100.0)
     @patch('actuator_control.time.sleep')
-    @patch('actuator_control.GPIO')
     @patch('actuator_control.stop_actuator')
-    def test_retract_actuator(self, mock_stop, mock_gpio, mock_sleep):
+    def test_retract_actuator(self, mock_stop, mock_sleep, mock_monotonic):
         """Test retracting the actuator"""
         duration = 2.0
-        actuator_control.retract_actuator(duration)
+        mock_lines = MagicMock()
+        deadline = actuator_control.retract_actuator(mock_lines, duration)
+        self.assertEqual(deadline, 100.0 + duration)
         
         # Verify both GPIO pins set to OFF (retract)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_OFF)
-        mock_gpio.output.assert_any_call(actuator_control.RELAY_CHANNEL_2, actuator_control.RELAY_OFF)
+        mock_lines.set_values.assert_called_once_with(
+            [actuator_control.RELAY_OFF, actuator_control.RELAY_OFF])
         
         # Verify sleep was called with the duration
         mock_sleep.assert_any_call(duration)
         
         # Verify stop was called after retraction
-        mock_stop.assert_called_once()
+        mock_stop.assert_called_once_with(mock_lines)
+    
+    def test_set_relays_skips_unchanged(self):
+        """Test that writing the levels the relays already have is skipped"""
+        mock_lines = MagicMock()
+        actuator_control.stop_actuator(mock_lines)
+        actuator_control.stop_actuator(mock_lines)
+        actuator_control.set_relays(mock_lines, actuator_control.EXTEND_VALUES)
+        actuator_control.set_relays(mock_lines, actuator_control.EXTEND_VALUES)
+        
+        on, off = actuator_control.RELAY_ON, actuator_control.RELAY_OFF
+        self.assertEqual(mock_lines.set_values.call_args_list, [call([on, off]), call([on, on])])
+        self.assertEqual(actuator_control.relay_values, actuator_control.EXTEND_VALUES)
+    
+    @patch('actuator_control.time.sleep')
+    def test_transitions_write_both_relays_at_once(self, mock_sleep):
+        """Test that each transition is a single write with no intermediate state"""
+        mock_lines = MagicMock()
+        actuator_control.extend_actuator(mock_lines, 1.0)
+        actuator_control.retract_actuator(mock_lines, 1.0)
+        
+        on, off = actuator_control.RELAY_ON, actuator_control.RELAY_OFF
+        self.assertEqual(mock_lines.set_values.call_args_list, [
+            call([on, on]),    # extend
+            call([on, off]),   # stop
+            call([off, off]),  # retract
+            call([on, off]),   # stop
+        ])
 
 
 class TestCycleFunctions(unittest.TestCase):
@@ -106,47 +237,251 @@ class TestCycleFunctions(unittest.TestCase):
     
     def setUp(self):
         """Reset state before each test"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
         actuator_control.running = False
         actuator_control.cycle_wait_time = 10.0
+        actuator_control.stop_event.clear()
+        actuator_control.relay_values = None
     
-    @patch('actuator_control.time.sleep')
-    @patch('actuator_control.retract_actuator')
-    @patch('actuator_control.extend_actuator')
-    def test_run_cycle(self, mock_extend, mock_retract, mock_sleep):
+    def tearDown(self):
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
+    
+    @patch('actuator_control.time.monotonic', return_value=100.0)
+    @patch('actuator_control.sleep_until', return_value=False)
+    def test_run_cycle(self, mock_sleep_until, mock_monotonic):
         """Test running a complete cycle"""
-        actuator_control.run_cycle()
+        stop_event = actuator_control.stop_event
+        mock_lines = MagicMock()
+        actuator_control.run_cycle(mock_lines, stop_event)
+        
+        # Verify extend, stop, retract, then stopped while waiting
+        on, off = actuator_control.RELAY_ON, actuator_control.RELAY_OFF
+        self.assertEqual(mock_lines.set_values.call_args_list, [
+            call([on, on]), call([on, off]), call([off, off]), call([on, off])])
+        
+        # Verify every phase ends at a deadline measured from the start of the cycle,
+        # with the current cycle wait time used for the final wait
+        extended = 100.0 + actuator_control.CYCLE_EXTEND_TIME
+        stopped = extended + actuator_control.STOP_DELAY
+        retracted = stopped + actuator_control.CYCLE_RETRACT_TIME
+        self.assertEqual(mock_sleep_until.call_args_list, [
+            call(extended, stop_event),
+            call(stopped, stop_event),
+            call(retracted, stop_event),
+            call(retracted + 10.0, stop_event),
+        ])
+        self.assertEqual(actuator_control.current_state, 'waiting')
+    
+    @patch('actuator_control.time.sleep')
+    def test_run_cycle_interrupted(self, mock_sleep):
+        """Test that a stop request ends the cycle without waiting"""
+        actuator_control.stop_event.set()
+        mock_lines = MagicMock()
+        
+        start = time.monotonic()
+        actuator_control.run_cycle(mock_lines, actuator_control.stop_event)
+        self.assertLess(time.monotonic() - start, 1.0)
+        
+        # Extend was cut short and the actuator left stopped; no retract
+        on, off = actuator_control.RELAY_ON, actuator_control.RELAY_OFF
+        self.assertEqual(mock_lines.set_values.call_args_list, [call([on, on]), call([on, off])])
+        self.assertEqual(actuator_control.current_state, 'stopped')
+        mock_sleep.assert_not_called()
+
+
+class TestConfiguration(unittest.TestCase):
+    """Test actuator configuration and the state machine it drives"""
+    
+    def setUp(self):
+        """Reset the last written relay levels"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
+        actuator_control.relay_values = None
+    
+    def tearDown(self):
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
+    
+    def test_default_config(self):
+        """Test that no arguments give the module defaults"""
+        cfg = actuator_control.config_from_args(actuator_control.parse_args([]))
+        self.assertEqual(cfg, actuator_control.ActuatorConfig())
+        self.assertEqual((cfg.pin_a, cfg.pin_b),
+                         (actuator_control.RELAY_CHANNEL_1, actuator_control.RELAY_CHANNEL_2))
+        self.assertEqual(cfg.extend, actuator_control.CYCLE_EXTEND_TIME)
+        self.assertEqual(cfg.wait, actuator_control.CYCLE_WAIT_TIME)
+    
+    def test_config_from_args(self):
+        """Test overriding pins and timing from the command line"""
+        args = actuator_control.parse_args([
+            '--pins', '18', '23', '--extend', '3', '--retract', '2.5',
+            '--wait', '30', '--initial-retract', '3', '--stop-delay', '0.2'])
+        cfg = actuator_control.config_from_args(args)
+        self.assertEqual(cfg, actuator_control.ActuatorConfig(
+            pin_a=18, pin_b=23, extend=3.0, retract=2.5, wait=30.0,
+            initial_retract=3.0, stop_delay=0.2))
+    
+    def test_config_is_frozen(self):
+        """Test that a configuration cannot be modified once built"""
+        cfg = actuator_control.ActuatorConfig()
+        with self.assertRaises(AttributeError):
+            cfg.extend = 1.0
+    
+    @patch('actuator_control.time.monotonic', return_value=0.0)
+    @patch('actuator_control.sleep_until', return_value=False)
+    def test_run_state_machine(self, mock_sleep_until, mock_monotonic):
+        """Test running the state machine with an explicit config and lines"""
+        cfg = actuator_control.ActuatorConfig(extend=1.0, retract=2.0, stop_delay=0.5)
+        stop = threading.Event()
+        lines = MagicMock()
+        actuator_control.cycle_wait_time = 4.0
+        
+        actuator_control.run_state_machine(cfg, stop, lines)
+        
+        self.assertEqual(lines.set_values.call_count, 4)
+        self.assertEqual(mock_sleep_until.call_args_list, [
+            call(1.0, stop), call(1.5, stop), call(3.5, stop), call(7.5, stop)])
+
+
+class TestShutdown(unittest.TestCase):
+    """Test signal handling and cleanup at exit"""
+    
+    def setUp(self):
+        """Reset state before each test"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
+        actuator_control.running = True
+        actuator_control.stop_event.clear()
+    
+    def tearDown(self):
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
+    
+    @patch('actuator_control.cleanup_gpio')
+    @patch('actuator_control.stop_actuator')
+    def test_signal_handler(self, mock_stop, mock_cleanup):
+        """Test that a signal only wakes the control thread and interrupts the server"""
+        with self.assertRaises(KeyboardInterrupt):
+            actuator_control.signal_handler(signal.SIGTERM, None)
         
-        # Verify extend was called
-        mock_extend.assert_called_once_with(actuator_control.CYCLE_EXTEND_TIME)
+        self.assertFalse(actuator_control.running)
+        self.assertTrue(actuator_control.stop_event.is_set())
         
-        # Verify stop delay
-        mock_sleep.assert_any_call(actuator_control.STOP_DELAY)
+        # GPIO is left to the atexit hook
+        mock_stop.assert_not_called()
+        mock_cleanup.assert_not_called()
+    
+    @patch('actuator_control.cleanup_gpio')
+    @patch('actuator_control.stop_actuator')
+    @patch('actuator_control.lines')
+    def test_shutdown(self, mock_lines, mock_stop, mock_cleanup):
+        """Test that the actuator is stopped and the lines released at exit"""
+        actuator_control.shutdown()
         
-        # Verify retract was called
-        mock_retract.assert_called_once_with(actuator_control.CYCLE_RETRACT_TIME)
+        mock_stop.assert_called_once_with(mock_lines)
+        mock_cleanup.assert_called_once()
+    
+    @patch('actuator_control.cleanup_gpio')
+    @patch('actuator_control.stop_actuator')
+    @patch('actuator_control.lines', None)
+    def test_shutdown_without_gpio(self, mock_stop, mock_cleanup):
+        """Test exiting before the GPIO lines were requested"""
+        actuator_control.shutdown()
         
-        # Verify cycle wait time was used
-        mock_sleep.assert_any_call(10.0)
+        mock_stop.assert_not_called()
+        mock_cleanup.assert_called_once()
+
+
+class TestLogging(unittest.TestCase):
+    """Test queued logging setup"""
+    
+    def tearDown(self):
+        """Remove the handlers added by setup_logging"""
+        for handler in list(actuator_control.log.handlers):
+            actuator_control.log.removeHandler(handler)
+        actuator_control.log.setLevel(logging.NOTSET)
+        actuator_control.log.propagate = True
+    
+    def test_setup_logging_quiet_by_default(self):
+        """Test that debug records are dropped without --verbose"""
+        listener = actuator_control.setup_logging(actuator_control.parse_args([]).verbose)
+        listener.stop()
+        
+        self.assertFalse(actuator_control.log.isEnabledFor(logging.DEBUG))
+        self.assertTrue(actuator_control.log.isEnabledFor(logging.WARNING))
+    
+    def test_setup_logging_verbose(self):
+        """Test that records are queued for the listener thread"""
+        listener = actuator_control.setup_logging(actuator_control.parse_args(['--verbose']).verbose)
+        listener.stop()
+        
+        self.assertTrue(actuator_control.log.isEnabledFor(logging.DEBUG))
+        self.assertIsInstance(actuator_control.log.handlers[0], logging.handlers.QueueHandler)
+        
+        actuator_control.log.debug("State set to %s", 'opening')
+        record = actuator_control.log_queue.get_nowait()
+        self.assertEqual(record.getMessage(), "State set to opening")
+
+
+class TestSleepUntil(unittest.TestCase):
+    """Test deadline-based sleeping"""
+    
+    @patch('actuator_control.time.monotonic', return_value=100.0)
+    @patch('actuator_control.time.sleep')
+    def test_sleep_until_future_deadline(self, mock_sleep, mock_monotonic):
+        """Test sleeping for the time remaining until the deadline"""
+        self.assertFalse(actuator_control.sleep_until(101.5))
+        mock_sleep.assert_called_once_with(1.5)
+    
+    @patch('actuator_control.time.monotonic', return_value=100.0)
+    @patch('actuator_control.time.sleep')
+    def test_sleep_until_past_deadline(self, mock_sleep, mock_monotonic):
+        """Test that a deadline already passed returns immediately"""
+        actuator_control.sleep_until(99.0)
+        mock_sleep.assert_not_called()
+    
+    @patch('actuator_control.time.monotonic', return_value=100.0)
+    def test_sleep_until_waits_on_stop_event(self, mock_monotonic):
+        """Test that a stop event is waited on instead of sleeping"""
+        stop = MagicMock()
+        stop.wait.return_value = True
+        
+        self.assertTrue(actuator_control.sleep_until(101.5, stop))
+        stop.wait.assert_called_once_with(1.5)
 
 
 class TestAPIRoutes(unittest.TestCase):
     """Test Flask API endpoints"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create one test client and fake out the control thread for the whole class"""
+        cls.app = actuator_control.app
+        cls.app.config['TESTING'] = True
+        cls.client = cls.app.test_client()
+        cls._thread_patcher = patch('actuator_control.threading.Thread', new=_FakeThread)
+        cls._thread_patcher.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Restore threading.Thread"""
+        cls._thread_patcher.stop()
+    
     def setUp(self):
-        """Reset state and create test client before each test"""
+        """Reset state before each test"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
         actuator_control.running = False
         actuator_control.cycle_wait_time = 10.0
         actuator_control.cycle_thread = None
-        self.app = actuator_control.app
-        self.client = self.app.test_client()
-        self.app.config['TESTING'] = True
+        actuator_control.stop_event.clear()
+        self.app.config['gpio_lines'] = MagicMock()
     
     def tearDown(self):
-        """Clean up after each test"""
-        actuator_control.running = False
-        if actuator_control.cycle_thread and actuator_control.cycle_thread.is_alive():
-            actuator_control.running = False
-            actuator_control.cycle_thread.join(timeout=1.0)
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
     
     def test_get_status_stopped(self):
         """Test getting status when stopped"""
@@ -156,7 +491,7 @@ class TestAPIRoutes(unittest.TestCase):
         response = self.client.get('/api/status')
         self.assertEqual(response.status_code, 200)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['running'])
         self.assertEqual(data['cycle_wait_time'], 15.0)
     
@@ -168,30 +503,76 @@ class TestAPIRoutes(unittest.TestCase):
         response = self.client.get('/api/status')
         self.assertEqual(response.status_code, 200)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertTrue(data['running'])
         self.assertEqual(data['cycle_wait_time'], 20.0)
     
-    @patch('actuator_control.threading.Thread')
-    def test_start_cycling_success(self, mock_thread):
+    @patch('actuator_control.orjson.dumps', wraps=actuator_control.orjson.dumps)
+    def test_get_status_cached(self, mock_dumps):
+        """Test that the status body is only re-serialized when it changes"""
+        actuator_control.cycle_wait_time = 12.0
+        actuator_control.status_cache = (None, b'')
+        
+        first = self.client.get('/api/status')
+        second = self.client.get('/api/status')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(mock_dumps.call_count, 1)
+        
+        actuator_control.cycle_wait_time = 13.0
+        data = self.client.get('/api/status').get_json()
+        self.assertEqual(data['cycle_wait_time'], 13.0)
+        self.assertEqual(mock_dumps.call_count, 2)
+    
+    def test_start_cycling_success(self):
         """Test starting the actuator successfully"""
         actuator_control.running = False
-        mock_thread_instance = MagicMock()
-        mock_thread.return_value = mock_thread_instance
+        mock_lines = MagicMock()
+        self.app.config['gpio_lines'] = mock_lines
         
         response = self.client.post('/api/start')
         self.assertEqual(response.status_code, 200)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertTrue(data['success'])
         self.assertIn('started', data['message'].lower())
         
-        # Verify thread was created and started
-        mock_thread.assert_called_once()
-        mock_thread_instance.start.assert_called_once()
+        # Verify thread was created with the app's line handle and started
+        thread = actuator_control.cycle_thread
+        self.assertIsInstance(thread, _FakeThread)
+        self.assertIs(thread.target, actuator_control.actuator_control_loop)
+        self.assertEqual(thread.args, (mock_lines, actuator_control.stop_event))
+        self.assertTrue(thread.daemon)
+        self.assertTrue(thread.started)
         
-        # Verify running flag was set
+        # Replaced and started under lock, so a racing restart joins this thread
+        self.assertTrue(thread.started_under_lock)
+        
+        # Verify running flag was set and the stop event cleared
         self.assertTrue(actuator_control.running)
+        self.assertFalse(actuator_control.stop_event.is_set())
+    
+    def test_stop_then_start_joins_previous_thread(self):
+        """Test that a restart waits for the stopped control thread to exit"""
+        self.app.config['gpio_lines'] = MagicMock()
+        previous = MagicMock()
+        
+        def previous_exits(timeout=None):
+            # The old thread must still see the stop request when it exits
+            self.assertFalse(actuator_control.running)
+            self.assertTrue(actuator_control.stop_event.is_set())
+        
+        previous.join.side_effect = previous_exits
+        actuator_control.running = True
+        actuator_control.cycle_thread = previous
+        
+        with patch('actuator_control.stop_actuator'):
+            self.assertEqual(self.client.post('/api/stop').status_code, 200)
+        self.assertEqual(self.client.post('/api/start').status_code, 200)
+        
+        previous.join.assert_called_once()
+        self.assertIsInstance(actuator_control.cycle_thread, _FakeThread)
+        self.assertTrue(actuator_control.cycle_thread.started)
+        self.assertFalse(actuator_control.stop_event.is_set())
     
     def test_start_cycling_already_running(self):
         """Test starting when already running"""
@@ -200,7 +581,7 @@ class TestAPIRoutes(unittest.TestCase):
         response = self.client.post('/api/start')
         self.assertEqual(response.status_code, 400)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['success'])
         self.assertIn('already', data['message'].lower())
     
@@ -212,15 +593,25 @@ class TestAPIRoutes(unittest.TestCase):
         response = self.client.post('/api/stop')
         self.assertEqual(response.status_code, 200)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertTrue(data['success'])
         self.assertIn('stopped', data['message'].lower())
         
-        # Verify stop_actuator was called
-        mock_stop.assert_called_once()
+        # Verify stop_actuator was called on the app's lines
+        mock_stop.assert_called_once_with(self.app.config['gpio_lines'])
         
-        # Verify running flag was cleared
+        # Verify running flag was cleared and the control thread woken
         self.assertFalse(actuator_control.running)
+        self.assertTrue(actuator_control.stop_event.is_set())
+    
+    @patch('actuator_control.extend_actuator')
+    def test_open_actuator(self, mock_extend):
+        """Test opening the actuator through the app's lines"""
+        response = self.client.post('/api/open')
+        self.assertEqual(response.status_code, 200)
+        
+        mock_extend.assert_called_once_with(
+            self.app.config['gpio_lines'], actuator_control.CYCLE_EXTEND_TIME)
     
     def test_stop_cycling_not_running(self):
         """Test stopping when not running"""
@@ -229,7 +620,7 @@ class TestAPIRoutes(unittest.TestCase):
         response = self.client.post('/api/stop')
         self.assertEqual(response.status_code, 400)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['success'])
         self.assertIn('not running', data['message'].lower())
     
@@ -239,12 +630,11 @@ class TestAPIRoutes(unittest.TestCase):
         
         response = self.client.post(
             '/api/cycle_wait_time',
-            data=json.dumps({'time': new_time}),
-            content_type='application/json'
+            json={'time': new_time}
         )
         self.assertEqual(response.status_code, 200)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertTrue(data['success'])
         self.assertEqual(data['cycle_wait_time'], new_time)
         self.assertEqual(actuator_control.cycle_wait_time, new_time)
@@ -253,12 +643,11 @@ class TestAPIRoutes(unittest.TestCase):
         """Test updating cycle wait time without time parameter"""
         response = self.client.post(
             '/api/cycle_wait_time',
-            data=json.dumps({}),
-            content_type='application/json'
+            json={}
         )
         self.assertEqual(response.status_code, 400)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['success'])
         self.assertIn('missing', data['message'].lower())
     
@@ -266,12 +655,11 @@ class TestAPIRoutes(unittest.TestCase):
         """Test updating cycle wait time with negative value"""
         response = self.client.post(
             '/api/cycle_wait_time',
-            data=json.dumps({'time': -5}),
-            content_type='application/json'
+            json={'time': -5}
         )
         self.assertEqual(response.status_code, 400)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['success'])
         self.assertIn('non-negative', data['message'].lower())
     
@@ -279,75 +667,227 @@ class TestAPIRoutes(unittest.TestCase):
         """Test updating cycle wait time with invalid type"""
         response = self.client.post(
             '/api/cycle_wait_time',
-            data=json.dumps({'time': 'not a number'}),
+            json={'time': 'not a number'}
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        data = response.get_json()
+        self.assertFalse(data['success'])
+        self.assertIn('invalid', data['message'].lower())
+    
+    def test_update_cycle_wait_time_not_finite(self):
+        """Test that infinite, NaN or too long wait times are rejected"""
+        for value in ('inf', '-inf', 'nan', 'Infinity', 1e10, threading.TIMEOUT_MAX * 2):
+            response = self.client.post('/api/cycle_wait_time', json={'time': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('invalid', response.get_json()['message'].lower())
+        
+        self.assertEqual(actuator_control.cycle_wait_time, 10.0)
+    
+    def test_update_cycle_wait_time_numeric_string(self):
+        """Test that a numeric string is still accepted as a time"""
+        response = self.client.post(
+            '/api/cycle_wait_time',
+            json={'time': '7.5'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(actuator_control.cycle_wait_time, 7.5)
+    
+    def test_update_cycle_wait_time_malformed_body(self):
+        """Test updating cycle wait time with a body that is not JSON"""
+        response = self.client.post(
+            '/api/cycle_wait_time',
+            data='time=5',
             content_type='application/json'
         )
         self.assertEqual(response.status_code, 400)
         
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertFalse(data['success'])
         self.assertIn('invalid', data['message'].lower())
 
 
+class TestManualMoves(unittest.TestCase):
+    """Test manual moves while a live control thread is cycling"""
+    
+    def setUp(self):
+        """Run the real control loop with short phases on recording lines"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
+        actuator_control.running = False
+        actuator_control.cycle_thread = None
+        actuator_control.relay_values = None
+        actuator_control.stop_event.clear()
+        # Short opening, long closing, so the thread is waiting in 'closing'
+        actuator_control.config = actuator_control.ActuatorConfig(
+            extend=0.1, retract=5.0, wait=5.0, initial_retract=0.0, stop_delay=0.0)
+        actuator_control.cycle_wait_time = 5.0
+        
+        self.writes = []
+        self.lines = MagicMock()
+        self.lines.set_values.side_effect = lambda values: self.writes.append(
+            (threading.current_thread() is threading.main_thread(), list(values)))
+        actuator_control.app.config['gpio_lines'] = self.lines
+        self.client = actuator_control.app.test_client()
+        
+        self._realtime_patcher = patch('actuator_control.configure_realtime')
+        self._realtime_patcher.start()
+    
+    def tearDown(self):
+        """Stop the control thread and restore module state"""
+        actuator_control.running = False
+        actuator_control.stop_event.set()
+        if actuator_control.cycle_thread is not None:
+            actuator_control.cycle_thread.join(timeout=1.0)
+        self._realtime_patcher.stop()
+        self._guard.__exit__(None, None, None)
+    
+    def wait_for_state(self, state):
+        """Poll until the control thread reaches state"""
+        deadline = time.monotonic() + 2.0
+        while actuator_control.current_state != state:
+            self.assertLess(time.monotonic(), deadline, 'control thread never reached ' + state)
+            time.sleep(0.01)
+    
+    def test_open_while_cycling(self):
+        """Test that the control thread's stop cannot land after a manual open"""
+        self.assertEqual(self.client.post('/api/start').status_code, 200)
+        self.wait_for_state('closing')
+        
+        response = self.client.post('/api/open')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('paused', response.get_json()['message'])
+        self.assertFalse(actuator_control.cycle_thread.is_alive())
+        
+        # The manual extend and its own stop are the last writes, both from the request
+        on, off = actuator_control.RELAY_ON, actuator_control.RELAY_OFF
+        self.assertEqual(self.writes[-2:], [(True, [on, on]), (True, [on, off])])
+        manual = self.writes.index((True, [on, on]))
+        self.assertTrue(all(from_request for from_request, _ in self.writes[manual:]))
+
+
+class TestConfigureRealtime(unittest.TestCase):
+    """Test real-time setup of the control thread"""
+    
+    @patch('actuator_control.ctypes')
+    @patch('actuator_control.os')
+    def test_configure_realtime(self, mock_os, mock_ctypes):
+        """Test pinning, SCHED_FIFO and memory locking"""
+        mock_ctypes.CDLL.return_value.mlockall.return_value = 0
+        
+        actuator_control.configure_realtime()
+        
+        mock_os.sched_setaffinity.assert_called_once_with(0, {actuator_control.CONTROL_CPU})
+        mock_os.sched_param.assert_called_once_with(actuator_control.CONTROL_PRIORITY)
+        mock_os.sched_setscheduler.assert_called_once_with(
+            0, mock_os.SCHED_FIFO, mock_os.sched_param.return_value)
+        mock_ctypes.CDLL.return_value.mlockall.assert_called_once_with(
+            actuator_control.MCL_CURRENT | actuator_control.MCL_FUTURE)
+    
+    @patch('actuator_control.ctypes')
+    @patch('actuator_control.os')
+    def test_configure_realtime_without_privileges(self, mock_os, mock_ctypes):
+        """Test that missing privileges do not stop the control thread"""
+        mock_os.sched_setaffinity.side_effect = OSError(22, 'Invalid argument')
+        mock_os.sched_setscheduler.side_effect = PermissionError(1, 'Operation not permitted')
+        mock_ctypes.CDLL.return_value.mlockall.return_value = -1
+        mock_ctypes.get_errno.return_value = 12
+        
+        actuator_control.configure_realtime()
+        
+        mock_ctypes.CDLL.return_value.mlockall.assert_called_once()
+
+
 class TestActuatorControlLoop(unittest.TestCase):
     """Test the actuator control loop"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Patch out real sleeps and the loop's collaborators for the whole class"""
+        cls._patches = patch.multiple('actuator_control', time=DEFAULT,
+                                      configure_realtime=DEFAULT, run_cycle=DEFAULT,
+                                      retract_actuator=DEFAULT, stop_actuator=DEFAULT)
+        cls.mocks = cls._patches.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the patched module attributes"""
+        cls._patches.stop()
+    
     def setUp(self):
         """Reset state before each test"""
+        self._guard = _ModuleStateGuard()
+        self._guard.__enter__()
+        for mock in self.mocks.values():
+            mock.reset_mock(return_value=True, side_effect=True)
+        self.mocks['time'].sleep.return_value = None
         actuator_control.running = False
-        actuator_control.cycle_wait_time = 0.1  # Short wait for testing
+        actuator_control.cycle_wait_time = 0.0  # No code path may wait on wall clock
+        actuator_control.stop_event.clear()
+        self.lines = MagicMock()
     
-    @patch('actuator_control.time.sleep')
-    @patch('actuator_control.run_cycle')
-    @patch('actuator_control.retract_actuator')
-    @patch('actuator_control.setup_gpio')
-    def test_actuator_control_loop_initial_retract(self, mock_setup, mock_retract, mock_run_cycle, mock_sleep):
+    def tearDown(self):
+        """Restore module state"""
+        self._guard.__exit__(None, None, None)
+    
+    def stop_after_one(self, lines, stop):
+        """run_cycle side effect that ends the loop after the first cycle"""
+        actuator_control.running = False
+    
+    def test_actuator_control_loop_initial_retract(self):
         """Test that control loop performs initial retraction"""
         actuator_control.running = True
+        self.mocks['run_cycle'].side_effect = self.stop_after_one
         
         # Run the loop briefly
-        actuator_control.actuator_control_loop()
+        actuator_control.actuator_control_loop(self.lines, actuator_control.stop_event)
         
         # Verify initial retraction
-        mock_retract.assert_called_once_with(actuator_control.INITIAL_RETRACT_TIME)
+        self.mocks['retract_actuator'].assert_called_once_with(
+            self.lines, actuator_control.INITIAL_RETRACT_TIME, stop=actuator_control.stop_event)
     
-    @patch('actuator_control.time.sleep')
-    @patch('actuator_control.run_cycle')
-    @patch('actuator_control.retract_actuator')
-    @patch('actuator_control.setup_gpio')
-    def test_actuator_control_loop_runs_cycles(self, mock_setup, mock_retract, mock_run_cycle, mock_sleep):
+    def test_actuator_control_loop_runs_cycles(self):
         """Test that control loop runs cycles when running"""
         actuator_control.running = True
-        
-        # Make run_cycle set running to False after first call to prevent infinite loop
-        def stop_after_one():
-            actuator_control.running = False
-        
-        mock_run_cycle.side_effect = stop_after_one
+        self.mocks['run_cycle'].side_effect = self.stop_after_one
         
         # Run the loop
-        actuator_control.actuator_control_loop()
+        actuator_control.actuator_control_loop(self.lines, actuator_control.stop_event)
         
-        # Verify cycle was run
-        mock_run_cycle.assert_called()
+        # Verify cycle was run on the lines handed to the loop
+        self.mocks['run_cycle'].assert_called_with(self.lines, actuator_control.stop_event)
     
-    @patch('actuator_control.stop_actuator')
-    @patch('actuator_control.GPIO')
-    def test_actuator_control_loop_error_handling(self, mock_gpio, mock_stop):
+    def test_actuator_control_loop_error_handling(self):
         """Test error handling in control loop"""
         actuator_control.running = True
+        self.mocks['retract_actuator'].side_effect = Exception("GPIO error")
         
-        # Make setup_gpio raise an exception
-        mock_gpio.setmode.side_effect = Exception("GPIO error")
+        # Run the loop - the initial retraction fails and should be handled gracefully
+        with self.assertLogs('actuator', level='ERROR') as logs:
+            actuator_control.actuator_control_loop(self.lines, actuator_control.stop_event)
         
-        # Run the loop - should handle error gracefully
-        actuator_control.actuator_control_loop()
+        # Verify the traceback is logged with the error
+        self.assertIsNotNone(logs.records[0].exc_info)
         
-        # Verify stop was called
-        mock_stop.assert_called()
+        # Verify stop was called and no cycle was started
+        self.mocks['stop_actuator'].assert_called_with(self.lines)
+        self.mocks['run_cycle'].assert_not_called()
         
         # Verify running was set to False
         self.assertFalse(actuator_control.running)
+    
+    @patch('actuator_control.lines')
+    def test_actuator_control_loop_error_keeps_lines(self, mock_lines):
+        """Test that an error in the loop does not release the GPIO lines"""
+        actuator_control.running = True
+        self.mocks['run_cycle'].side_effect = Exception("cycle error")
+        
+        actuator_control.actuator_control_loop(mock_lines, actuator_control.stop_event)
+        
+        self.mocks['stop_actuator'].assert_called_once_with(mock_lines)
+        mock_lines.release.assert_not_called()
+        self.assertIs(actuator_control.lines, mock_lines)
+        self.assertFalse(actuator_control.running)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Unit tests for gpio_control.py
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+import io
+import sys
+
+import gpio_control
+
+
+class TestMain(unittest.TestCase):
+    """Test command line handling"""
+    
+    def setUp(self):
+        """Start every test with RPi.GPIO not yet loaded"""
+        gpio_control.GPIO = None
+    
+    def tearDown(self):
+        """Drop the GPIO module a test may have loaded"""
+        gpio_control.GPIO = None
+    
+    @patch('sys.stderr', new_callable=io.StringIO)
+    @patch('sys.argv', ['gpio_control.py', '30', 'on'])
+    def test_invalid_pin_without_force(self, mock_stderr):
+        """Test that an unusual pin is refused without importing RPi.GPIO"""
+        # A None entry makes any import of RPi.GPIO raise ImportError
+        with patch.dict(sys.modules, {'RPi': None, 'RPi.GPIO': None}):
+            with self.assertRaises(SystemExit) as cm:
+                gpio_control.main()
+        
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn('--force', mock_stderr.getvalue())
+        self.assertIsNone(gpio_control.GPIO)
+    
+    @patch('sys.stdout', new_callable=io.StringIO)
+    @patch('sys.argv', ['gpio_control.py', '30', 'on', '--force'])
+    def test_invalid_pin_with_force(self, mock_stdout):
+        """Test that --force sets up the pin anyway"""
+        rpi = MagicMock()
+        with patch.dict(sys.modules, {'RPi': rpi, 'RPi.GPIO': rpi.GPIO}):
+            gpio_control.main()
+        
+        rpi.GPIO.setup.assert_called_once_with(30, rpi.GPIO.OUT, initial=rpi.GPIO.HIGH)
+        self.assertIn('GPIO 30 set to ON', mock_stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()